@@ -0,0 +1,160 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# --- Cohort Analytics ---
+# Aggregates are computed over chunked reads of diary_entries so memory stays
+# flat at millions of rows; each chunk is reduced to small partial sums that
+# are combined at the end.
+CHUNK_SIZE = int(os.getenv("ANALYTICS_CHUNK_SIZE", "200000"))
+
+# Bumped by every write path in main.py; cached results from an older version are stale
+_version = 0
+_cache = {}
+_lock = threading.Lock()
+
+
+def invalidate():
+    global _version
+    with _lock:
+        _version += 1
+        _cache.clear()
+
+
+def _cutoff(days):
+    # diary_entries.date is CURRENT_TIMESTAMP, i.e. UTC "YYYY-MM-DD HH:MM:SS"
+    return (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _read_chunks(db_path, columns, since=None, chunk_size=CHUNK_SIZE):
+    conn = sqlite3.connect(db_path)
+    try:
+        query = f"SELECT {', '.join(columns)} FROM diary_entries"
+        params = ()
+        if since:
+            # Served by idx_diary_date
+            query += " WHERE date >= ?"
+            params = (since,)
+        for chunk in pd.read_sql_query(query, conn, params=params, chunksize=chunk_size):
+            yield chunk
+    finally:
+        conn.close()
+
+
+def _numeric_scores(chunk):
+    # score has INTEGER affinity but can hold stray text from Gemini; such rows
+    # become NaN and are dropped by the caller instead of failing the query
+    return chunk.assign(score=pd.to_numeric(chunk["score"], errors="coerce"))
+
+
+def _max_entry_id(db_path):
+    # Cheap rowid lookup; also catches inserts made by other worker processes
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT MAX(id) FROM diary_entries").fetchone()[0] or 0
+    finally:
+        conn.close()
+
+
+def _cached(db_path, key, compute):
+    stamp = (_version, _max_entry_id(db_path))
+    with _lock:
+        hit = _cache.get(key)
+        if hit and hit[0] == stamp:
+            return hit[1]
+    result = compute()
+    with _lock:
+        # Don't store a result computed across an invalidation
+        if stamp[0] == _version:
+            _cache[key] = (stamp, result)
+    return result
+
+
+def daily_scores(db_path, days=30):
+    # Average score and entry count per UTC day over the last `days` days
+    def compute():
+        totals = None
+        for chunk in _read_chunks(db_path, ["date", "score"], since=_cutoff(days)):
+            chunk = _numeric_scores(chunk).dropna(subset=["score"])
+            if chunk.empty:
+                continue
+            day = chunk["date"].str.slice(0, 10)
+            part = chunk["score"].groupby(day).agg(["sum", "count"])
+            totals = part if totals is None else totals.add(part, fill_value=0)
+        if totals is None:
+            return []
+        totals = totals.sort_index()
+        avg = (totals["sum"] / totals["count"]).round(1)
+        return [
+            {"day": d, "avg_score": float(a), "entries": int(c)}
+            for d, a, c in zip(totals.index, avg.to_numpy(), totals["count"].to_numpy())
+        ]
+    # The window moves at midnight UTC even when nothing new is written
+    day = datetime.utcnow().strftime("%Y-%m-%d")
+    return _cached(db_path, ("daily_scores", days, day), compute)
+
+
+def sentiment_by_lang(db_path, days=None, top=10):
+    # Most frequent sentiment keywords per language
+    def compute():
+        counts = None
+        for chunk in _read_chunks(db_path, ["lang", "sentiment"], since=_cutoff(days) if days else None):
+            chunk = chunk.dropna(subset=["sentiment"])
+            if chunk.empty:
+                continue
+            part = chunk.fillna({"lang": "unknown"}).groupby(["lang", "sentiment"]).size()
+            counts = part if counts is None else counts.add(part, fill_value=0)
+        if counts is None:
+            return {}
+        result = {}
+        for lang, group in counts.groupby(level=0):
+            group = group.droplevel(0).sort_values(ascending=False).head(top)
+            result[lang] = [{"sentiment": s, "count": int(c)} for s, c in group.items()]
+        return result
+    day = datetime.utcnow().strftime("%Y-%m-%d") if days else None
+    return _cached(db_path, ("sentiment_by_lang", days, top, day), compute)
+
+
+def score_drops(db_path, recent_days=7, baseline_days=30, threshold=20, min_entries=2):
+    # Users whose average score over the last `recent_days` fell at least
+    # `threshold` points below their average in the `baseline_days` before that.
+    def compute():
+        now = datetime.utcnow()
+        recent_start = (now - timedelta(days=recent_days)).strftime("%Y-%m-%d %H:%M:%S")
+        totals = None
+        for chunk in _read_chunks(db_path, ["user_email", "score", "date"],
+                                  since=_cutoff(recent_days + baseline_days)):
+            chunk = _numeric_scores(chunk).dropna(subset=["user_email", "score"])
+            if chunk.empty:
+                continue
+            period = np.where(chunk["date"].to_numpy() >= recent_start, "recent", "baseline")
+            part = chunk["score"].groupby([chunk["user_email"], period]).agg(["sum", "count"])
+            totals = part if totals is None else totals.add(part, fill_value=0)
+        if totals is None:
+            return []
+        wide = totals.unstack(fill_value=0)
+        if ("count", "recent") not in wide or ("count", "baseline") not in wide:
+            return []
+        recent_n = wide[("count", "recent")]
+        baseline_n = wide[("count", "baseline")]
+        wide = wide[(recent_n >= 1) & (baseline_n >= min_entries)]
+        recent_avg = wide[("sum", "recent")] / wide[("count", "recent")]
+        baseline_avg = wide[("sum", "baseline")] / wide[("count", "baseline")]
+        drop = baseline_avg - recent_avg
+        flagged = drop[drop >= threshold].sort_values(ascending=False)
+        return [
+            {
+                "email": email,
+                "baseline_avg": round(float(baseline_avg[email]), 1),
+                "recent_avg": round(float(recent_avg[email]), 1),
+                "drop": round(float(d), 1),
+                "recent_entries": int(wide.loc[email, ("count", "recent")]),
+            }
+            for email, d in flagged.items()
+        ]
+    day = datetime.utcnow().strftime("%Y-%m-%d")
+    return _cached(db_path, ("score_drops", recent_days, baseline_days, threshold, min_entries, day), compute)
@@ -0,0 +1,113 @@
+import os
+import hmac
+import time
+import base64
+import hashlib
+import asyncio
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Password Hashing Settings ---
+# scrypt parameters; raising these later makes old hashes get rehashed on login
+SCRYPT_N = int(os.getenv("SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_BYTES = 32
+HASH_PREFIX = "scrypt"
+
+# hashlib.scrypt releases the GIL, so a thread pool gives real parallelism
+# and keeps the KDF off the event loop.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(8, (os.cpu_count() or 1) + 1))))
+_hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="kdf")
+
+# --- Session Token Settings ---
+# Set SESSION_SECRET in .env so tokens survive restarts and work across workers
+SESSION_SECRET = (os.getenv("SESSION_SECRET") or secrets.token_hex(32)).encode()
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(60 * 60 * 24)))
+
+
+def _b64e(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _b64d(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    # maxmem must cover 128 * n * r bytes plus overhead
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r + 1024 * 1024, dklen=HASH_BYTES
+    )
+
+
+def is_hashed(stored):
+    return bool(stored) and stored.startswith(HASH_PREFIX + "$")
+
+
+def hash_password(password):
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"{HASH_PREFIX}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64e(salt)}${_b64e(digest)}"
+
+
+def verify_password(password, stored):
+    if not stored or not isinstance(password, str):
+        return False
+    if not is_hashed(stored):
+        # Legacy plaintext row; caller rehashes it after a successful match
+        return hmac.compare_digest(password.encode(), stored.encode())
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        candidate = _scrypt(password, _b64d(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(candidate, _b64d(digest))
+    except (ValueError, TypeError):
+        return False
+
+
+def needs_rehash(stored):
+    if not is_hashed(stored):
+        return True
+    try:
+        _, n, r, p, _, _ = stored.split("$")
+        return (int(n), int(r), int(p)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    except ValueError:
+        return True
+
+
+async def hash_password_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_pool, hash_password, password)
+
+
+async def verify_password_async(password, stored):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_pool, verify_password, password, stored)
+
+
+def create_session_token(email, role="user", ttl=SESSION_TTL_SECONDS):
+    # Stateless HMAC-signed token: "<payload>.<signature>", payload is email|role|expiry
+    expires = int(time.time()) + ttl
+    payload = _b64e(f"{email}|{role}|{expires}".encode())
+    signature = _b64e(hmac.new(SESSION_SECRET, payload.encode(), hashlib.sha256).digest())
+    return f"{payload}.{signature}"
+
+
+def verify_session_token(token):
+    # Returns {"email", "role", "expires"} for a valid token, otherwise None
+    if not token or "." not in token:
+        return None
+    payload, signature = token.rsplit(".", 1)
+    expected = _b64e(hmac.new(SESSION_SECRET, payload.encode(), hashlib.sha256).digest())
+    if not hmac.compare_digest(signature, expected):
+        return None
+    try:
+        email, role, expires = _b64d(payload).decode().rsplit("|", 2)
+        expires = int(expires)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if expires < time.time():
+        return None
+    return {"email": email, "role": role, "expires": expires}
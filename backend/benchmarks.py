@@ -0,0 +1,498 @@
+import time
+import asyncio
+import argparse
+
+# Standalone benchmarks for backend hot paths. Run from the backend directory:
+#   python benchmarks.py login --concurrency 32 --requests 256
+#   python benchmarks.py serialize --entries 10000
+#   python benchmarks.py subscribers --subscribers 1000 5000 20000
+#   python benchmarks.py connections --connections 1000 5000
+#   python benchmarks.py feed --readers 8 --likers 4 --seconds 5
+#   python benchmarks.py analytics --entries 1000000
+
+
+async def _loop_lag_probe(stop, interval=0.005):
+    # Measures the worst delay the event loop adds to a short sleep
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def _run_logins(verify, concurrency, total, password, stored):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            assert await verify(password, stored)
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_loop_lag_probe(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await probe
+
+
+def bench_login(args):
+    import auth
+
+    stored = auth.hash_password("benchmark-password")
+
+    async def inline_verify(password, stored_hash):
+        # What a naive swap would do: run the KDF directly on the event loop
+        return auth.verify_password(password, stored_hash)
+
+    print(f"scrypt n={auth.SCRYPT_N} r={auth.SCRYPT_R} p={auth.SCRYPT_P}, "
+          f"pool workers={auth.HASH_WORKERS}, concurrency={args.concurrency}, requests={args.requests}")
+    for label, verify in (("inline", inline_verify), ("pooled", auth.verify_password_async)):
+        elapsed, lag = asyncio.run(
+            _run_logins(verify, args.concurrency, args.requests, "benchmark-password", stored)
+        )
+        print(f"{label:>7}: {args.requests / elapsed:8.1f} logins/s, "
+              f"max event loop lag {lag * 1000:7.1f} ms")
+
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        auth.verify_session_token(auth.create_session_token("bench@test.com"))
+    elapsed = time.perf_counter() - start
+    print(f"  token: {args.requests / elapsed:8.1f} create+verify/s")
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def bench_serialize(args):
+    # Times the real /history response path (query, validation, serialization,
+    # compression middleware) through TestClient against a seeded database.
+    import os
+    import sqlite3
+    import tempfile
+    import warnings
+    warnings.simplefilter("ignore")
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from fastapi.testclient import TestClient
+
+    os.chdir(tempfile.mkdtemp())
+    import main
+
+    email = "bench@test.com"
+    sentiments = ["평온", "불안", "기쁨", "피곤", "Hopeful", "Stressed"]
+    conn = sqlite3.connect(main.DB_PATH)
+    conn.executemany(
+        "INSERT INTO diary_entries (user_email, content, lang, sentiment, score, summary, prescription, date) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(email, "일기", "ko", sentiments[i % len(sentiments)], (i * 37) % 101,
+          "오늘은 조금 지쳤지만 스스로를 잘 돌본 하루였어요. " * 2,
+          "따뜻한 차 한 잔과 10분 산책을 추천해요.",
+          f"2026-{(i // 28) % 12 + 1:02d}-{i % 28 + 1:02d} 21:{i % 60:02d}:00")
+         for i in range(args.entries)]
+    )
+    conn.commit()
+    conn.close()
+
+    print(f"/history with {args.entries} entries")
+    with TestClient(main.app) as client:
+        path = f"/history/{email}"
+        payload = client.get(path, headers={"Accept-Encoding": "identity"}).json()
+        # What a route without a response model pays: jsonable_encoder + json.dumps
+        old_time, old_body = _best_of(
+            lambda: JSONResponse(jsonable_encoder(payload)).body, args.repeat
+        )
+        print(f"  encode only, dict + jsonable_encoder : {old_time * 1000:8.2f} ms, {len(old_body):>10,} bytes")
+        model = main.HistoryResponse.model_validate(payload)
+        new_time, new_body = _best_of(lambda: model.model_dump_json().encode(), args.repeat)
+        print(f"  encode only, Pydantic response model : {new_time * 1000:8.2f} ms, {len(new_body):>10,} bytes")
+        for label, encoding in (("identity", "identity"), ("gzip", "gzip"), ("br", "br")):
+            elapsed, response = _best_of(
+                lambda: client.get(path, headers={"Accept-Encoding": encoding}), args.repeat
+            )
+            served = response.headers.get("content-encoding", "identity")
+            # httpx decodes the body; the header holds the compressed size
+            size = int(response.headers.get("content-length") or len(response.content))
+            print(f"  full GET, Accept-Encoding {label:<8}     : {elapsed * 1000:8.2f} ms, "
+                  f"{size:>10,} bytes ({served})")
+
+
+async def _hub_round(count, events):
+    from realtime import Hub
+
+    hub = Hub()
+    delivered = 0
+    done = asyncio.Event()
+    expected = count * events
+
+    async def consume(sub):
+        # Stands in for a connection handler: drain events, mark activity
+        nonlocal delivered
+        while True:
+            event = await sub.next_event(timeout=60)
+            if event.get("type") == "heartbeat":
+                continue
+            sub.touch()
+            delivered += 1
+            if delivered >= expected:
+                done.set()
+
+    subs = [hub.subscribe(f"user{i}@test.com") for i in range(count)]
+    consumers = [asyncio.create_task(consume(sub)) for sub in subs]
+    await asyncio.sleep(0)
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_loop_lag_probe(stop))
+    start = time.perf_counter()
+    for n in range(events):
+        for sub in subs:
+            hub.publish(sub.email, {"type": "analysis", "index": n % 101})
+        # Let consumers run between publish rounds, as request handlers would
+        await asyncio.sleep(0)
+    await done.wait()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lag = await probe
+
+    for task in consumers:
+        task.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+    return elapsed, lag, hub
+
+
+async def _hub_memory(count):
+    # Bytes held per idle subscriber: queue + waiting handler task
+    import tracemalloc
+    from realtime import Hub
+
+    hub = Hub()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    subs = [hub.subscribe(f"user{i}@test.com") for i in range(count)]
+    tasks = [asyncio.create_task(sub.next_event(timeout=60)) for sub in subs]
+    await asyncio.sleep(0)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return (used - base) / count
+
+
+def bench_subscribers(args):
+    print(f"in-process hub fan-out, {args.events} events per subscriber "
+          "(socket I/O not included)")
+    for count in args.subscribers:
+        elapsed, lag, hub = asyncio.run(_hub_round(count, args.events))
+        per_sub = asyncio.run(_hub_memory(count))
+        total = count * args.events
+        print(f"{count:>7} subscribers: {total / elapsed:10.0f} deliveries/s, "
+              f"max loop lag {lag * 1000:6.1f} ms, ~{per_sub / 1024:5.1f} KiB/subscriber, "
+              f"dropped {hub.stats()['dropped']}")
+
+
+def _rss_kib(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+async def _open_connections(url, count, token_for, in_flight):
+    import websockets
+
+    sem = asyncio.Semaphore(in_flight)
+
+    async def connect(i):
+        email = f"user{i}@test.com"
+        async with sem:
+            ws = await websockets.connect(
+                f"{url}/ws/{email}?token={token_for(email)}", open_timeout=60, ping_interval=None
+            )
+        return email, ws
+
+    results = await asyncio.gather(*(connect(i) for i in range(count)), return_exceptions=True)
+    sockets = dict(r for r in results if not isinstance(r, BaseException))
+    errors = [r for r in results if isinstance(r, BaseException)]
+    return sockets, errors
+
+
+async def _measure_delivery(base_url, sockets, token_for, samples):
+    import json
+    import random
+    import httpx
+
+    latencies = []
+    emails = random.sample(list(sockets), min(samples, len(sockets)))
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        for email in emails:
+            start = time.perf_counter()
+            await client.post("/wearables/heart-rate", json={"user_email": email, "bpm": 130},
+                              headers={"Authorization": f"Bearer {token_for(email)}"})
+            while True:
+                event = json.loads(await asyncio.wait_for(sockets[email].recv(), 30))
+                if event.get("type") == "stress_alert":
+                    break
+            latencies.append(time.perf_counter() - start)
+        stats = (await client.get("/admin/realtime")).json()
+    latencies.sort()
+    return latencies, stats
+
+
+def bench_connections(args):
+    # Opens real WebSocket subscribers against a single uvicorn worker and
+    # reports how many it holds, its memory per connection and push latency.
+    import os
+    import sys
+    import secrets
+    import socket
+    import tempfile
+    import subprocess
+    import urllib.request
+
+    os.environ["SESSION_SECRET"] = secrets.token_hex(32)
+    import auth
+
+    def token_for(email):
+        return auth.create_session_token(email)
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, PUSH_HEARTBEAT="600", PUSH_IDLE_TIMEOUT="3600")
+    server = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--port", str(port),
+         "--app-dir", os.path.dirname(os.path.abspath(__file__)), "--log-level", "warning",
+         "--ws", "websockets", "--backlog", "4096"],
+        cwd=tempfile.mkdtemp(), env=env
+    )
+    try:
+        for _ in range(300):
+            try:
+                urllib.request.urlopen(base_url + "/", timeout=1)
+                break
+            except OSError:
+                time.sleep(0.1)
+        idle_rss = _rss_kib(server.pid)
+        print(f"1 uvicorn worker (pid {server.pid}), idle RSS {idle_rss / 1024:.1f} MiB")
+
+        async def run(count):
+            start = time.perf_counter()
+            sockets, errors = await _open_connections(
+                base_url.replace("http", "ws"), count, token_for, args.in_flight
+            )
+            opened = time.perf_counter() - start
+            await asyncio.sleep(0.5)
+            rss = _rss_kib(server.pid)
+            latencies, stats = await _measure_delivery(base_url, sockets, token_for, args.samples)
+            await asyncio.gather(*(ws.close() for ws in sockets.values()), return_exceptions=True)
+            return len(sockets), errors, opened, rss, latencies, stats
+
+        for count in args.connections:
+            held, errors, opened, rss, latencies, stats = asyncio.run(run(count))
+            per_conn = (rss - idle_rss) / max(held, 1)
+            p50 = latencies[len(latencies) // 2] * 1000 if latencies else float("nan")
+            p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else float("nan")
+            print(f"{count:>7} requested: {held} held ({stats['connections']} seen by hub), "
+                  f"{len(errors)} failed, opened in {opened:.1f}s, "
+                  f"RSS {rss / 1024:.1f} MiB (~{per_conn:.1f} KiB/conn), "
+                  f"push p50 {p50:.1f} ms p99 {p99:.1f} ms")
+            if errors:
+                print(f"         first error: {errors[0]!r}")
+            time.sleep(1)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+
+def bench_feed(args):
+    import os
+    import random
+    import sqlite3
+    import tempfile
+    import threading
+    import community
+
+    db_path = os.path.join(tempfile.mkdtemp(), "feed_bench.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE users (email TEXT PRIMARY KEY, name TEXT, phone TEXT, password TEXT)")
+    community.init_tables(conn.cursor())
+    conn.executemany(
+        "INSERT INTO community_posts (author_email, author_name, content) VALUES (?, ?, ?)",
+        [(f"user{i % 50}@test.com", f"user{i % 50}", f"post {i}") for i in range(args.posts)]
+    )
+    conn.commit()
+    conn.close()
+
+    stop = threading.Event()
+    read_latencies = []
+    likes = [0]
+    lock = threading.Lock()
+
+    def reader():
+        local = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            page = community.get_feed(db_path)
+            if page["next_cursor"]:
+                community.get_feed(db_path, before=page["next_cursor"])
+            local.append(time.perf_counter() - start)
+        with lock:
+            read_latencies.extend(local)
+
+    def liker(n):
+        rng = random.Random(n)
+        # Concentrate likes on the first page, the worst case for the feed cache
+        top = args.posts
+        done = 0
+        while not stop.is_set():
+            post_id = rng.randint(max(1, top - community.PAGE_SIZE * 2), top)
+            email = f"liker{n}-{rng.randint(0, 999)}@test.com"
+            if rng.random() < 0.8:
+                community.like_post(db_path, post_id, email)
+            else:
+                community.unlike_post(db_path, post_id, email)
+            done += 1
+        with lock:
+            likes[0] += done
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=liker, args=(n,)) for n in range(args.likers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    read_latencies.sort()
+    p50 = read_latencies[len(read_latencies) // 2]
+    p99 = read_latencies[int(len(read_latencies) * 0.99)]
+    print(f"{args.readers} readers, {args.likers} likers, {args.posts} posts, {args.seconds}s")
+    print(f"  feed reads: {len(read_latencies) / args.seconds:9.0f}/s "
+          f"(first two pages, p50 {p50 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms)")
+    print(f"  likes     : {likes[0] / args.seconds:9.0f}/s")
+
+    conn = sqlite3.connect(db_path)
+    mismatched = conn.execute("""
+        SELECT COUNT(*) FROM community_posts p
+        WHERE like_count != (SELECT COUNT(*) FROM community_likes l WHERE l.post_id = p.id)
+    """).fetchone()[0]
+    conn.close()
+    cached = [(p["id"], p["likes"]) for p in community.get_feed(db_path)["posts"]]
+    community.invalidate_feed()
+    fresh = [(p["id"], p["likes"]) for p in community.get_feed(db_path)["posts"]]
+    print(f"  counters  : {mismatched} posts out of sync with community_likes")
+    print(f"  cache     : cached first page {'matches' if cached == fresh else 'DIFFERS from'} the database")
+
+
+def bench_analytics(args):
+    # Times the dashboard aggregates over a seeded diary_entries table. A few
+    # rows carry text scores, as Gemini sometimes writes; they must be skipped.
+    import os
+    import sqlite3
+    import tempfile
+    from datetime import datetime, timedelta
+    import analytics
+    import schema
+
+    db_path = os.path.join(tempfile.mkdtemp(), "analytics_bench.db")
+    conn = sqlite3.connect(db_path)
+    schema.create_tables(conn.cursor())
+    now = datetime.utcnow()
+    sentiments = ["평온", "불안", "기쁨", "피곤", "Hopeful", "Stressed"]
+    text_scores = ["high", "", "N/A"]
+
+    def row(i):
+        score = text_scores[i % 3] if i % 1000 == 0 else (i * 37) % 101
+        date = (now - timedelta(minutes=i * 60 // 50)).strftime("%Y-%m-%d %H:%M:%S")
+        return (f"user{i % 500}@test.com", ["ko", "en", "ja"][i % 3], sentiments[i % 6], score, date)
+
+    conn.executemany(
+        "INSERT INTO diary_entries (user_email, lang, sentiment, score, date) VALUES (?, ?, ?, ?, ?)",
+        (row(i) for i in range(args.entries))
+    )
+    conn.commit()
+    numeric = conn.execute(
+        "SELECT COUNT(*) FROM diary_entries WHERE date >= ? AND typeof(score) = 'integer'",
+        (analytics._cutoff(30),)
+    ).fetchone()[0]
+    conn.close()
+
+    print(f"{args.entries} diary entries ({args.entries // 1000} with text scores), "
+          f"chunk size {analytics.CHUNK_SIZE}")
+    for label, run in (
+        ("daily_scores(30)", lambda: analytics.daily_scores(db_path, 30)),
+        ("sentiment_by_lang", lambda: analytics.sentiment_by_lang(db_path)),
+        ("score_drops(7, 30)", lambda: analytics.score_drops(db_path, 7, 30)),
+    ):
+        analytics.invalidate()
+        start = time.perf_counter()
+        result = run()
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        run()
+        warm = time.perf_counter() - start
+        print(f"  {label:<18}: cold {cold * 1000:8.1f} ms, cached {warm * 1000:6.2f} ms")
+        if label.startswith("daily_scores"):
+            counted = sum(d["entries"] for d in result)
+            print(f"  {'':<18}  {counted} numeric scores counted, {numeric} expected "
+                  f"({'ok' if counted == numeric else 'MISMATCH'})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feelconomy backend benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    login = sub.add_parser("login", help="Password verification throughput under concurrency")
+    login.add_argument("--concurrency", type=int, default=32)
+    login.add_argument("--requests", type=int, default=256)
+    login.set_defaults(func=bench_login)
+
+    serialize = sub.add_parser("serialize", help="JSON encoding time and compressed size of large histories")
+    serialize.add_argument("--entries", type=int, default=10000)
+    serialize.add_argument("--repeat", type=int, default=5)
+    serialize.set_defaults(func=bench_serialize)
+
+    subscribers = sub.add_parser("subscribers", help="Push hub fan-out with many concurrent subscribers")
+    subscribers.add_argument("--subscribers", type=int, nargs="+", default=[1000, 5000, 20000])
+    subscribers.add_argument("--events", type=int, default=10)
+    subscribers.set_defaults(func=bench_subscribers)
+
+    connections = sub.add_parser("connections", help="Real WebSocket subscribers held by one uvicorn worker")
+    connections.add_argument("--connections", type=int, nargs="+", default=[1000, 5000])
+    connections.add_argument("--in-flight", type=int, default=200)
+    connections.add_argument("--samples", type=int, default=50)
+    connections.set_defaults(func=bench_connections)
+
+    feed = sub.add_parser("feed", help="Community feed reads under concurrent likes")
+    feed.add_argument("--readers", type=int, default=8)
+    feed.add_argument("--likers", type=int, default=4)
+    feed.add_argument("--posts", type=int, default=10000)
+    feed.add_argument("--seconds", type=float, default=5)
+    feed.set_defaults(func=bench_feed)
+
+    cohort = sub.add_parser("analytics", help="Admin dashboard aggregates over a large diary table")
+    cohort.add_argument("--entries", type=int, default=1000000)
+    cohort.set_defaults(func=bench_analytics)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
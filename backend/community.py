@@ -0,0 +1,242 @@
+import os
+import sqlite3
+import threading
+
+# --- Community Feed ---
+# Like/comment counts live on the post row and are updated in the same
+# transaction as the like/comment itself, so reads never run COUNT(*).
+PAGE_SIZE = int(os.getenv("FEED_PAGE_SIZE", "20"))
+POST_COLUMNS = "id, author_email, author_name, content, like_count, comment_count, created_at"
+
+# First page of the feed, shared by every reader until a write changes it
+_first_page = None
+# Bumped on every write so a page read during a write is never cached
+_generation = 0
+_lock = threading.Lock()
+
+
+def init_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS community_posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            author_email TEXT,
+            author_name TEXT,
+            content TEXT,
+            like_count INTEGER NOT NULL DEFAULT 0,
+            comment_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS community_likes (
+            post_id INTEGER,
+            user_email TEXT,
+            PRIMARY KEY (post_id, user_email)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS community_comments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id INTEGER,
+            user_email TEXT,
+            author_name TEXT,
+            content TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_post ON community_comments (post_id, id)")
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.isolation_level = None  # explicit BEGIN IMMEDIATE for writes
+    # Safe under WAL; skips an fsync per like/comment commit
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+def _post_dict(row):
+    return {
+        "id": row[0],
+        "author_email": row[1],
+        "author": row[2],
+        "content": row[3],
+        "likes": row[4],
+        "comments": row[5],
+        "created_at": row[6],
+    }
+
+
+def invalidate_feed():
+    global _first_page, _generation
+    with _lock:
+        _first_page = None
+        _generation += 1
+
+
+def _patch_cached_post(post_id, field, value):
+    # Counter changes update the cached page in place instead of dropping it,
+    # so a burst of likes doesn't force every reader back to the database.
+    global _generation
+    with _lock:
+        _generation += 1
+        if _first_page is None:
+            return
+        for post in _first_page["posts"]:
+            if post["id"] == post_id:
+                post[field] = value
+                return
+
+
+def _query_page(db_path, before, limit):
+    conn = _connect(db_path)
+    try:
+        if before is None:
+            rows = conn.execute(
+                f"SELECT {POST_COLUMNS} FROM community_posts ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        else:
+            # Keyset pagination: an index seek on id, no OFFSET scan
+            rows = conn.execute(
+                f"SELECT {POST_COLUMNS} FROM community_posts WHERE id < ? ORDER BY id DESC LIMIT ?",
+                (before, limit)
+            ).fetchall()
+    finally:
+        conn.close()
+    posts = [_post_dict(r) for r in rows]
+    next_cursor = posts[-1]["id"] if len(posts) == limit else None
+    return {"posts": posts, "next_cursor": next_cursor}
+
+
+def get_feed(db_path, before=None, limit=PAGE_SIZE):
+    global _first_page
+    if before is not None or limit != PAGE_SIZE:
+        return _query_page(db_path, before, limit)
+    with _lock:
+        if _first_page is not None:
+            return {"posts": [dict(p) for p in _first_page["posts"]],
+                    "next_cursor": _first_page["next_cursor"]}
+        generation = _generation
+    page = _query_page(db_path, None, limit)
+    with _lock:
+        if generation == _generation:
+            _first_page = {"posts": [dict(p) for p in page["posts"]], "next_cursor": page["next_cursor"]}
+    return page
+
+
+def _author_name(conn, email):
+    row = conn.execute("SELECT name FROM users WHERE email = ?", (email,)).fetchone()
+    return row[0] if row and row[0] else (email or "").split("@")[0] or "Anon"
+
+
+def create_post(db_path, email, content):
+    conn = _connect(db_path)
+    try:
+        # Author name is copied onto the post so feed reads need no join
+        name = _author_name(conn, email)
+        cursor = conn.execute(
+            "INSERT INTO community_posts (author_email, author_name, content) VALUES (?, ?, ?)",
+            (email, name, content)
+        )
+        post_id = cursor.lastrowid
+        row = conn.execute(f"SELECT {POST_COLUMNS} FROM community_posts WHERE id = ?", (post_id,)).fetchone()
+    finally:
+        conn.close()
+    invalidate_feed()
+    return _post_dict(row)
+
+
+def _change_like(db_path, post_id, email, add):
+    # Returns the new like count, or None if the post doesn't exist
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if add:
+                changed = conn.execute(
+                    "INSERT OR IGNORE INTO community_likes (post_id, user_email) "
+                    "SELECT id, ? FROM community_posts WHERE id = ?",
+                    (email, post_id)
+                ).rowcount
+                delta = 1
+            else:
+                changed = conn.execute(
+                    "DELETE FROM community_likes WHERE post_id = ? AND user_email = ?",
+                    (post_id, email)
+                ).rowcount
+                delta = -1
+            if changed:
+                conn.execute(
+                    "UPDATE community_posts SET like_count = like_count + ? WHERE id = ?",
+                    (delta, post_id)
+                )
+            row = conn.execute("SELECT like_count FROM community_posts WHERE id = ?", (post_id,)).fetchone()
+            # Patch while still holding the write lock so cache updates land in commit order
+            if row is not None:
+                _patch_cached_post(post_id, "likes", row[0])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            invalidate_feed()
+            raise
+    finally:
+        conn.close()
+    return row[0] if row is not None else None
+
+
+def like_post(db_path, post_id, email):
+    return _change_like(db_path, post_id, email, True)
+
+
+def unlike_post(db_path, post_id, email):
+    return _change_like(db_path, post_id, email, False)
+
+
+def add_comment(db_path, post_id, email, content):
+    # Returns (comment, new comment count), or None if the post doesn't exist
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            updated = conn.execute(
+                "UPDATE community_posts SET comment_count = comment_count + 1 WHERE id = ?", (post_id,)
+            ).rowcount
+            if not updated:
+                conn.execute("ROLLBACK")
+                return None
+            name = _author_name(conn, email)
+            cursor = conn.execute(
+                "INSERT INTO community_comments (post_id, user_email, author_name, content) VALUES (?, ?, ?, ?)",
+                (post_id, email, name, content)
+            )
+            comment_id = cursor.lastrowid
+            count = conn.execute("SELECT comment_count FROM community_posts WHERE id = ?", (post_id,)).fetchone()[0]
+            created_at = conn.execute(
+                "SELECT created_at FROM community_comments WHERE id = ?", (comment_id,)
+            ).fetchone()[0]
+            _patch_cached_post(post_id, "comments", count)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            invalidate_feed()
+            raise
+    finally:
+        conn.close()
+    comment = {"id": comment_id, "post_id": post_id, "author": name, "content": content, "created_at": created_at}
+    return comment, count
+
+
+def get_comments(db_path, post_id, after=None, limit=PAGE_SIZE):
+    # Oldest first, keyset-paginated on comment id
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT id, author_name, content, created_at FROM community_comments "
+            "WHERE post_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (post_id, after or 0, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+    comments = [{"id": r[0], "author": r[1], "content": r[2], "created_at": r[3]} for r in rows]
+    next_cursor = comments[-1]["id"] if len(comments) == limit else None
+    return {"comments": comments, "next_cursor": next_cursor}
@@ -0,0 +1,207 @@
+import os
+import gzip
+import sqlite3
+import argparse
+
+import orjson
+
+import analytics
+import schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Streaming export/import of users and diary_entries.
+#   python data_export.py export diary_entries --out diary.ndjson.gz
+#   python data_export.py export users --out users.parquet
+#   python data_export.py import diary_entries --src diary.ndjson.gz
+#   python data_export.py import diary_entries --src diary.parquet --replace   # restore ids as exported
+
+TABLES = {
+    "users": ["email", "name", "phone", "password"],
+    "diary_entries": ["id", "user_email", "content", "lang", "sentiment", "score",
+                      "summary", "prescription", "date"],
+}
+# Columns served by GET /admin/export; credentials never leave through HTTP
+HTTP_COLUMNS = {
+    "users": ["email", "name", "phone"],
+    "diary_entries": TABLES["diary_entries"],
+}
+CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))
+
+if pa is not None:
+    PARQUET_SCHEMAS = {
+        "users": pa.schema([(c, pa.string()) for c in TABLES["users"]]),
+        "diary_entries": pa.schema([
+            ("id", pa.int64()), ("user_email", pa.string()), ("content", pa.string()),
+            ("lang", pa.string()), ("sentiment", pa.string()), ("score", pa.float64()),
+            ("summary", pa.string()), ("prescription", pa.string()), ("date", pa.string()),
+        ]),
+    }
+
+
+def _check_table(table):
+    if table not in TABLES:
+        raise ValueError(f"Unknown table: {table}")
+    return TABLES[table]
+
+
+def _to_float(value):
+    # score has INTEGER affinity but can hold REAL or stray text from Gemini
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_chunks(db_path, table, chunk_size=CHUNK_SIZE, columns=None):
+    # Keyset pagination on rowid: each chunk is an index seek, and only one
+    # chunk is held in memory at a time.
+    allowed = _check_table(table)
+    columns = columns or allowed
+    if any(c not in allowed for c in columns):
+        raise ValueError(f"Unknown column for {table}")
+    conn = sqlite3.connect(db_path)
+    try:
+        last_rowid = 0
+        while True:
+            rows = conn.execute(
+                f"SELECT rowid, {', '.join(columns)} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, chunk_size)
+            ).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            yield [row[1:] for row in rows]
+    finally:
+        conn.close()
+
+
+def iter_ndjson(db_path, table, columns=None, chunk_size=CHUNK_SIZE):
+    # Yields one bytes block of newline-delimited JSON per chunk
+    columns = columns or _check_table(table)
+    for rows in iter_chunks(db_path, table, chunk_size, columns):
+        yield b"".join(orjson.dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def export_table(db_path, table, out_path, chunk_size=CHUNK_SIZE):
+    # Format follows the extension: .parquet, .ndjson.gz or .ndjson
+    columns = _check_table(table)
+    count = 0
+    if out_path.endswith(".parquet"):
+        if pq is None:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        parquet_schema = PARQUET_SCHEMAS[table]
+        with pq.ParquetWriter(out_path, parquet_schema, compression="zstd") as writer:
+            for rows in iter_chunks(db_path, table, chunk_size):
+                data = {c: [r[i] for r in rows] for i, c in enumerate(columns)}
+                if "score" in data:
+                    data["score"] = [_to_float(v) for v in data["score"]]
+                writer.write_table(pa.Table.from_pydict(data, schema=parquet_schema))
+                count += len(rows)
+    else:
+        opener = gzip.open if out_path.endswith(".gz") else open
+        with opener(out_path, "wb") as f:
+            for rows in iter_chunks(db_path, table, chunk_size):
+                f.write(b"".join(orjson.dumps(dict(zip(columns, row))) + b"\n" for row in rows))
+                count += len(rows)
+    print(f"Exported {count} rows from {table} to {out_path}")
+    return count
+
+
+def _read_batches(src_path, columns, chunk_size):
+    if src_path.endswith(".parquet"):
+        if pq is None:
+            raise RuntimeError("Parquet import requires pyarrow (pip install pyarrow)")
+        parquet_file = pq.ParquetFile(src_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            data = batch.to_pydict()
+            present = [c for c in columns if c in data]
+            yield present, list(zip(*(data[c] for c in present)))
+        return
+    opener = gzip.open if src_path.endswith(".gz") else open
+    with opener(src_path, "rb") as f:
+        batch = []
+        present = None
+        for line in f:
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            if present is None:
+                present = [c for c in columns if c in record]
+            batch.append(tuple(record.get(c) for c in present))
+            if len(batch) >= chunk_size:
+                yield present, batch
+                batch = []
+        if batch:
+            yield present, batch
+
+
+def import_table(db_path, table, src_path, chunk_size=CHUNK_SIZE, replace=False):
+    # One transaction per batch: far fewer fsyncs than row-by-row commits,
+    # while never holding the write lock for the whole file.
+    # By default existing rows are never touched: diary entries get fresh ids
+    # and users whose email already exists are skipped. replace=True restores
+    # rows under their exported keys, overwriting whatever is there.
+    columns = _check_table(table)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA synchronous = NORMAL")
+    # Importing into a fresh file creates the app's schema first
+    with conn:
+        schema.create_tables(conn.cursor())
+    verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+    count = 0
+    try:
+        for present, rows in _read_batches(src_path, columns, chunk_size):
+            if not replace and "id" in present:
+                keep = [i for i, c in enumerate(present) if c != "id"]
+                present = [present[i] for i in keep]
+                rows = [tuple(row[i] for i in keep) for row in rows]
+            placeholders = ", ".join("?" * len(present))
+            before = conn.total_changes
+            with conn:
+                conn.executemany(
+                    f"{verb} INTO {table} ({', '.join(present)}) VALUES ({placeholders})",
+                    rows
+                )
+            count += conn.total_changes - before
+        # Drops cached analytics in this process. A running server sees new ids
+        # through its MAX(id) check, but not rows overwritten by replace=True.
+        analytics.invalidate()
+        print(f"Imported {count} rows into {table} from {src_path}")
+        return count
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk export/import of Feelconomy data")
+    parser.add_argument("--db", default="feelconomy.db")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Write a table to .parquet, .ndjson.gz or .ndjson")
+    export.add_argument("table", choices=list(TABLES))
+    export.add_argument("--out", required=True)
+
+    load = sub.add_parser("import", help="Load a table from .parquet, .ndjson.gz or .ndjson")
+    load.add_argument("table", choices=list(TABLES))
+    load.add_argument("--src", required=True)
+    load.add_argument("--replace", action="store_true",
+                      help="Overwrite rows with the same id/email instead of keeping existing data")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_table(args.db, args.table, args.out, args.chunk_size)
+    else:
+        import_table(args.db, args.table, args.src, args.chunk_size, args.replace)
+
+
+if __name__ == "__main__":
+    main()
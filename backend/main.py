@@ -1,7 +1,8 @@
 import os
 import json
 import re
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Header, Query, WebSocket, WebSocketDisconnect, Request
 from pydantic import BaseModel
 import google.generativeai as genai
 from dotenv import load_dotenv
@@ -9,8 +10,36 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
 
-app = FastAPI(title="토닥토닥 Backend")
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+@asynccontextmanager
+async def lifespan(app):
+    # Background tasks live for as long as the server does
+    tasks = [
+        asyncio.create_task(maintenance.maintenance_loop(DB_PATH, on_user_deleted=analytics.invalidate)),
+        asyncio.create_task(hub.reaper_loop()),
+    ]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+
+app = FastAPI(title="토닥토닥 Backend", lifespan=lifespan)
+
+# Compress responses over this size; smaller bodies aren't worth the CPU
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+if BrotliMiddleware:
+    # Brotli for clients that accept it, gzip for the rest
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESS_MIN_SIZE, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE)
 
 # Allow CORS for mobile and web dev
 app.add_middleware(
@@ -27,8 +56,22 @@ genai.configure(api_key=api_key)
 model = genai.GenerativeModel('gemini-2.0-flash')
 BaseModel_Sentiment = model # Just for reference if needed
 
+import sys
 import sqlite3
-from typing import List, Optional
+import asyncio
+from typing import List, Optional, Union
+
+# Sibling modules import the same way whether the app is started from
+# backend/ (uvicorn main:app) or the repo root (uvicorn backend.main:app)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analytics
+import auth
+import community
+import data_export
+import maintenance
+import schema
+from realtime import hub
 
 # --- Database Setup ---
 DB_PATH = "feelconomy.db"
@@ -36,36 +79,15 @@ DB_PATH = "feelconomy.db"
 def init_db():
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
-    # Users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            email TEXT PRIMARY KEY,
-            name TEXT,
-            phone TEXT,
-            password TEXT
-        )
-    ''')
-    # Diary entries table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS diary_entries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_email TEXT,
-            content TEXT,
-            lang TEXT,
-            sentiment TEXT,
-            score INTEGER,
-            summary TEXT,
-            prescription TEXT,
-            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_email) REFERENCES users (email)
-        )
-    ''')
+    schema.create_tables(cursor)
+    # WAL lets readers proceed while background maintenance batches write
+    cursor.execute("PRAGMA journal_mode=WAL")
     # Insert default test user if not exists
     cursor.execute("SELECT email FROM users WHERE email = ?", ('test@test.com',))
     if not cursor.fetchone():
         cursor.execute(
             "INSERT INTO users (email, name, phone, password) VALUES (?, ?, ?, ?)",
-            ('test@test.com', 'Test User', '010-0000-0000', '1234')
+            ('test@test.com', 'Test User', '010-0000-0000', auth.hash_password('1234'))
         )
     
     conn.commit()
@@ -82,7 +104,44 @@ class UserSignup(BaseModel):
     email: str
     name: str
     phone: str
-    password: Optional[str] = "1234"
+    password: str
+
+# Response models: routes that declare one are serialized straight to JSON
+# bytes by Pydantic, skipping jsonable_encoder. Used for the large list payloads.
+class HistoryItem(BaseModel):
+    sentiment: Optional[str] = None
+    score: Union[int, float, str, None] = None
+    summary: Optional[str] = None
+    prescription: Optional[str] = None
+    date: Optional[str] = None
+
+class HistoryResponse(BaseModel):
+    history: List[HistoryItem]
+
+class UserInfo(BaseModel):
+    email: str
+    name: Optional[str] = None
+    phone: Optional[str] = None
+    password: str
+
+class UserListResponse(BaseModel):
+    users: List[UserInfo]
+
+class UserUpdate(BaseModel):
+    email: Optional[str] = None
+    name: str
+    phone: str
+
+class CommunityPost(BaseModel):
+    content: str
+
+class HeartRateReading(BaseModel):
+    user_email: str
+    bpm: int
+
+# Push a stress alert when a diary score or heart rate crosses these
+STRESS_ALERT_SCORE = int(os.getenv("STRESS_ALERT_SCORE", "30"))
+STRESS_ALERT_BPM = int(os.getenv("STRESS_ALERT_BPM", "100"))
 
 class ChatMessage(BaseModel):
     message: str
@@ -172,10 +231,16 @@ async def analyze_sentiment(entry: DiaryEntry):
                 ''', db_data)
                 conn.commit()
                 conn.close()
+                analytics.invalidate()
                 print(f"Saved entry for {entry.user_email}")
             except Exception as db_err:
                 print(f"Database error: {db_err}")
 
+            hub.publish(entry.user_email, {"type": "analysis", "lang": entry.lang, **result})
+            score = result.get("index")
+            if isinstance(score, (int, float)) and score < STRESS_ALERT_SCORE:
+                hub.publish(entry.user_email, {"type": "stress_alert", "source": "diary", "score": score})
+
         return result
     except Exception as e:
         print(f"Critical error in analyze_sentiment: {str(e)}")
@@ -249,11 +314,14 @@ async def chat_with_ai(chat: ChatMessage):
 
 @app.post("/signup")
 async def signup(user: UserSignup):
+    if not user.password.strip():
+        raise HTTPException(status_code=400, detail="Password is required")
     try:
+        password_hash = await auth.hash_password_async(user.password)
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         cursor.execute("INSERT OR REPLACE INTO users (email, name, phone, password) VALUES (?, ?, ?, ?)", 
-                       (user.email, user.name, user.phone, user.password))
+                       (user.email, user.name, user.phone, password_hash))
         conn.commit()
         conn.close()
         return {"status": "success", "message": "User registered"}
@@ -261,15 +329,19 @@ async def signup(user: UserSignup):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/login")
-async def login(auth: dict):
-    email = auth.get("email")
-    password = auth.get("password")
+async def login(auth_data: dict):
+    email = auth_data.get("email")
+    password = auth_data.get("password")
     print(f"Login attempt: {email}")
     
     # Check for hardcoded admin
     if email == "admin" and password == "admin1234":
         print("Admin login successful")
-        return {"status": "success", "user": {"email": "admin", "name": "Administrator", "role": "admin"}}
+        return {
+            "status": "success",
+            "user": {"email": "admin", "name": "Administrator", "role": "admin"},
+            "token": auth.create_session_token("admin", "admin")
+        }
 
     # Regular users: Check email AND password
     conn = sqlite3.connect(DB_PATH)
@@ -280,10 +352,26 @@ async def login(auth: dict):
     
     if user:
         stored_email, stored_name, stored_password = user
-        # Verification: password must match
-        if password == stored_password:
+        # Verification runs the KDF in the hash pool, off the event loop
+        if await auth.verify_password_async(password, stored_password):
+            # Migrate plaintext or outdated hashes transparently
+            if auth.needs_rehash(stored_password):
+                try:
+                    new_hash = await auth.hash_password_async(password)
+                    conn = sqlite3.connect(DB_PATH)
+                    conn.execute("UPDATE users SET password = ? WHERE email = ? AND password = ?",
+                                 (new_hash, stored_email, stored_password))
+                    conn.commit()
+                    conn.close()
+                    print(f"Rehashed password for {email}")
+                except Exception as e:
+                    print(f"Error rehashing password for {email}: {e}")
             print(f"User login successful: {email}")
-            return {"status": "success", "user": {"email": stored_email, "name": stored_name, "role": "user"}}
+            return {
+                "status": "success",
+                "user": {"email": stored_email, "name": stored_name, "role": "user"},
+                "token": auth.create_session_token(stored_email, "user")
+            }
         else:
             print(f"Login failed: Incorrect password for {email}")
             return {"status": "fail", "message": "Incorrect password"}
@@ -292,7 +380,88 @@ async def login(auth: dict):
         # For new users / social login check
         return {"status": "new", "message": "User not found"}
 
-@app.get("/history/{email}")
+def _bearer_token(authorization):
+    return authorization[7:] if authorization and authorization.startswith("Bearer ") else authorization
+
+def _require_session(authorization):
+    # Writes act as the account in the /login token, never an email from the request
+    session = auth.verify_session_token(_bearer_token(authorization))
+    if not session:
+        raise HTTPException(status_code=401, detail="Invalid or expired session")
+    return session
+
+def _require_admin(authorization):
+    session = auth.verify_session_token(_bearer_token(authorization))
+    if not session or session["role"] != "admin":
+        raise HTTPException(status_code=401, detail="Admin session required")
+    return session
+
+@app.get("/session")
+async def get_session(authorization: Optional[str] = Header(None)):
+    # Lets clients resume with the token from /login instead of re-sending credentials
+    session = auth.verify_session_token(_bearer_token(authorization))
+    if not session:
+        raise HTTPException(status_code=401, detail="Invalid or expired session")
+    if session["role"] == "admin":
+        return {"status": "success", "user": {"email": "admin", "name": "Administrator", "role": "admin"}}
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT email, name FROM users WHERE email = ?", (session["email"],))
+    user = cursor.fetchone()
+    conn.close()
+    if not user:
+        raise HTTPException(status_code=401, detail="User no longer exists")
+    return {"status": "success", "user": {"email": user[0], "name": user[1], "role": "user"}}
+
+@app.get("/community/posts")
+async def get_community_feed(before: Optional[int] = None, limit: int = community.PAGE_SIZE):
+    # Pass next_cursor back as `before` for the next page
+    limit = max(1, min(limit, 100))
+    return await asyncio.to_thread(community.get_feed, DB_PATH, before, limit)
+
+@app.post("/community/posts")
+async def create_community_post(post: CommunityPost, authorization: Optional[str] = Header(None)):
+    session = _require_session(authorization)
+    if not post.content.strip():
+        raise HTTPException(status_code=400, detail="Post content is empty")
+    created = await asyncio.to_thread(community.create_post, DB_PATH, session["email"], post.content.strip())
+    return {"status": "success", "post": created}
+
+@app.post("/community/posts/{post_id}/like")
+async def like_community_post(post_id: int, authorization: Optional[str] = Header(None)):
+    session = _require_session(authorization)
+    likes = await asyncio.to_thread(community.like_post, DB_PATH, post_id, session["email"])
+    if likes is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return {"status": "success", "likes": likes}
+
+@app.delete("/community/posts/{post_id}/like")
+async def unlike_community_post(post_id: int, authorization: Optional[str] = Header(None)):
+    session = _require_session(authorization)
+    likes = await asyncio.to_thread(community.unlike_post, DB_PATH, post_id, session["email"])
+    if likes is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return {"status": "success", "likes": likes}
+
+@app.get("/community/posts/{post_id}/comments")
+async def get_community_comments(post_id: int, after: Optional[int] = None, limit: int = community.PAGE_SIZE):
+    limit = max(1, min(limit, 100))
+    return await asyncio.to_thread(community.get_comments, DB_PATH, post_id, after, limit)
+
+@app.post("/community/posts/{post_id}/comments")
+async def add_community_comment(post_id: int, comment: CommunityPost, authorization: Optional[str] = Header(None)):
+    session = _require_session(authorization)
+    if not comment.content.strip():
+        raise HTTPException(status_code=400, detail="Comment is empty")
+    added = await asyncio.to_thread(
+        community.add_comment, DB_PATH, post_id, session["email"], comment.content.strip()
+    )
+    if added is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    created, count = added
+    return {"status": "success", "comment": created, "comments": count}
+
+@app.get("/history/{email}", response_model=HistoryResponse)
 async def get_history(email: str):
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
@@ -311,7 +480,7 @@ async def get_history(email: str):
         })
     return {"history": history}
 
-@app.get("/admin/users")
+@app.get("/admin/users", response_model=UserListResponse)
 async def get_all_users():
     try:
         conn = sqlite3.connect(DB_PATH)
@@ -326,7 +495,7 @@ async def get_all_users():
             "email": "admin",
             "name": "Administrator (System)",
             "phone": "N/A",
-            "password": "admin1234"
+            "password": "********"
         })
         
         for r in rows:
@@ -335,7 +504,8 @@ async def get_all_users():
                     "email": r[0],
                     "name": r[1],
                     "phone": r[2],
-                    "password": r[3]
+                    # Stored passwords are never exposed, hashed or not
+                    "password": "********"
                 })
         return {"users": users}
     except Exception as e:
@@ -349,18 +519,26 @@ async def delete_user(email: str):
         cursor = conn.cursor()
         cursor.execute("DELETE FROM users WHERE email = ?", (email,))
         print(f"Deleted from users: {cursor.rowcount} rows")
-        # Also delete their diary entries
-        cursor.execute("DELETE FROM diary_entries WHERE user_email = ?", (email,))
-        print(f"Deleted from diary_entries: {cursor.rowcount} rows")
+        # Entries written after this point belong to a re-registered account
+        cursor.execute("SELECT MAX(id) FROM diary_entries WHERE user_email = ?", (email,))
+        max_id = cursor.fetchone()[0] or 0
+        # Recorded in the same transaction so a restart mid-job can resume it
+        cursor.execute("INSERT OR REPLACE INTO pending_deletions (email, max_id) VALUES (?, ?)",
+                       (email, max_id))
         conn.commit()
         conn.close()
-        return {"status": "success", "message": f"User {email} deleted"}
+        # Diary entries are removed in small batches in the background
+        def work(jid):
+            maintenance.purge_user(DB_PATH, email, max_id, jid)
+            analytics.invalidate()
+        job_id = maintenance.start_job("delete_user", work, target=email)
+        return {"status": "success", "message": f"User {email} deleted", "job_id": job_id}
     except Exception as e:
         print(f"Error deleting user {email}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/admin/users/{email}")
-async def update_user(email: str, user_update: UserSignup):
+async def update_user(email: str, user_update: UserUpdate):
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
@@ -372,6 +550,150 @@ async def update_user(email: str, user_update: UserSignup):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _subscriber_allowed(email, token):
+    # Push channels carry personal data, so they require the /login session token
+    session = auth.verify_session_token(token)
+    return bool(session) and (session["email"] == email or session["role"] == "admin")
+
+@app.post("/wearables/heart-rate")
+async def report_heart_rate(reading: HeartRateReading, authorization: Optional[str] = Header(None)):
+    # Same check as subscribing: only the user (or an admin) can push to their channel
+    if not _subscriber_allowed(reading.user_email, _bearer_token(authorization)):
+        raise HTTPException(status_code=401, detail="Invalid or expired session")
+    alert = reading.bpm > STRESS_ALERT_BPM
+    if alert:
+        hub.publish(reading.user_email, {"type": "stress_alert", "source": "wearable", "bpm": reading.bpm})
+    return {"status": "success", "alert": alert}
+
+@app.websocket("/ws/{email}")
+async def push_websocket(websocket: WebSocket, email: str, token: Optional[str] = None):
+    if not _subscriber_allowed(email, token):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    sub = hub.subscribe(email)
+
+    async def watch_disconnect():
+        # Reads client frames so a close is noticed at once, not on the next send
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        except Exception:
+            pass
+        finally:
+            hub.unsubscribe(sub)  # wakes next_event() below
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        while True:
+            event = await sub.next_event()
+            await websocket.send_json(event)
+            sub.touch()
+    except (WebSocketDisconnect, ConnectionAbortedError, RuntimeError):
+        pass
+    finally:
+        watcher.cancel()
+        hub.unsubscribe(sub)
+
+@app.get("/events/{email}")
+async def push_events(request: Request, email: str, token: Optional[str] = None):
+    # Server-Sent Events fallback for clients without WebSocket support
+    if not _subscriber_allowed(email, token):
+        raise HTTPException(status_code=401, detail="Invalid or expired session")
+    sub = hub.subscribe(email)
+
+    async def stream():
+        try:
+            while not await request.is_disconnected():
+                event = await sub.next_event()
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+                sub.touch()
+        except ConnectionAbortedError:
+            pass
+        finally:
+            hub.unsubscribe(sub)
+
+    # identity encoding keeps the compression middleware from buffering events
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "Content-Encoding": "identity"})
+
+@app.get("/admin/realtime")
+async def realtime_stats():
+    return hub.stats()
+
+# Windows are bounded so a stray value can't overflow the date math or flood the cache
+MAX_ANALYTICS_DAYS = 3650
+
+@app.get("/admin/analytics/daily-scores")
+async def analytics_daily_scores(days: int = Query(30, ge=1, le=MAX_ANALYTICS_DAYS),
+                                 authorization: Optional[str] = Header(None)):
+    _require_admin(authorization)
+    # pandas work runs in a thread so dashboard refreshes don't stall other requests
+    return {"days": await asyncio.to_thread(analytics.daily_scores, DB_PATH, days)}
+
+@app.get("/admin/analytics/sentiments")
+async def analytics_sentiments(days: Optional[int] = Query(None, ge=1, le=MAX_ANALYTICS_DAYS),
+                               top: int = Query(10, ge=1, le=100),
+                               authorization: Optional[str] = Header(None)):
+    _require_admin(authorization)
+    return {"langs": await asyncio.to_thread(analytics.sentiment_by_lang, DB_PATH, days, top)}
+
+@app.get("/admin/analytics/score-drops")
+async def analytics_score_drops(recent_days: int = Query(7, ge=1, le=MAX_ANALYTICS_DAYS),
+                                baseline_days: int = Query(30, ge=1, le=MAX_ANALYTICS_DAYS),
+                                threshold: int = Query(20, ge=0, le=100),
+                                authorization: Optional[str] = Header(None)):
+    # Lists users by recent mood drop, so it is as sensitive as the diary itself
+    _require_admin(authorization)
+    users = await asyncio.to_thread(
+        analytics.score_drops, DB_PATH, recent_days, baseline_days, threshold
+    )
+    return {"users": users}
+
+@app.get("/admin/export/{table}")
+async def export_table(table: str, authorization: Optional[str] = Header(None)):
+    # Streams the table as NDJSON chunk by chunk; the compression middleware gzips it.
+    # Requires an admin session; password hashes are only available from the CLI.
+    _require_admin(authorization)
+    if table not in data_export.TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {table}")
+    return StreamingResponse(
+        data_export.iter_ndjson(DB_PATH, table, data_export.HTTP_COLUMNS[table]),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{table}.ndjson"'}
+    )
+
+@app.post("/admin/maintenance/{task}")
+async def run_maintenance(task: str, days: Optional[int] = None, authorization: Optional[str] = Header(None)):
+    # VACUUM blocks every writer while it runs, so only admins may start jobs
+    _require_admin(authorization)
+    if task == "retention":
+        retention_days = days if days is not None else maintenance.RETENTION_DAYS
+        if retention_days <= 0:
+            raise HTTPException(status_code=400, detail="Retention days must be greater than 0")
+        work = lambda jid: maintenance.compact_old_entries(DB_PATH, retention_days, jid)
+    elif task == "analyze":
+        work = lambda jid: maintenance.analyze_db(DB_PATH, jid)
+    elif task == "vacuum":
+        work = lambda jid: maintenance.vacuum_db(DB_PATH, jid)
+    else:
+        raise HTTPException(status_code=404, detail=f"Unknown maintenance task: {task}")
+    job_id = maintenance.start_job(task, work)
+    return {"status": "success", "job_id": job_id}
+
+@app.get("/admin/maintenance/jobs")
+async def list_maintenance_jobs(authorization: Optional[str] = Header(None)):
+    _require_admin(authorization)
+    return {"jobs": list(maintenance.jobs.values())}
+
+@app.get("/admin/maintenance/jobs/{job_id}")
+async def get_maintenance_job(job_id: str, authorization: Optional[str] = Header(None)):
+    _require_admin(authorization)
+    job = maintenance.jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,233 @@
+import os
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+# --- Maintenance Settings ---
+# Rows touched per transaction. Small batches keep each write lock short so
+# /analyze-sentiment and /signup are never blocked behind a long delete.
+BATCH_SIZE = int(os.getenv("MAINTENANCE_BATCH_SIZE", "500"))
+# Raw diary `content` older than this is dropped; score/sentiment are kept. 0 disables.
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "0"))
+# How often the scheduler runs retention + ANALYZE, and VACUUM (in hours)
+MAINTENANCE_INTERVAL_HOURS = float(os.getenv("MAINTENANCE_INTERVAL_HOURS", "24"))
+VACUUM_INTERVAL_HOURS = float(os.getenv("VACUUM_INTERVAL_HOURS", "168"))
+
+# Job progress, keyed by job id. Read by /admin/maintenance/jobs.
+jobs = {}
+_jobs_lock = threading.Lock()
+MAX_FINISHED_JOBS = 100
+
+
+def new_job(kind, target=None):
+    job_id = uuid.uuid4().hex[:12]
+    with _jobs_lock:
+        jobs[job_id] = {
+            "id": job_id,
+            "kind": kind,
+            "target": target,
+            "status": "pending",
+            "processed": 0,
+            "total": None,
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+        }
+        _trim_jobs()
+    return job_id
+
+
+def _trim_jobs():
+    finished = [j for j in jobs.values() if j["status"] in ("done", "failed")]
+    if len(finished) > MAX_FINISHED_JOBS:
+        finished.sort(key=lambda j: j["finished_at"] or "")
+        for j in finished[:len(finished) - MAX_FINISHED_JOBS]:
+            jobs.pop(j["id"], None)
+
+
+def _update_job(job_id, **fields):
+    with _jobs_lock:
+        if job_id in jobs:
+            jobs[job_id].update(fields)
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _run_job(job_id, work):
+    # Wraps a maintenance step with status bookkeeping
+    _update_job(job_id, status="running", started_at=_now())
+    try:
+        work(job_id)
+        _update_job(job_id, status="done", finished_at=_now())
+    except Exception as e:
+        print(f"Maintenance job {job_id} failed: {e}")
+        _update_job(job_id, status="failed", error=str(e), finished_at=_now())
+
+
+def _connect(db_path):
+    # busy_timeout lets batches wait briefly for request writers instead of failing
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    return conn
+
+
+def delete_user_entries(db_path, email, max_id, job_id=None, batch_size=BATCH_SIZE):
+    # Deletes a user's diary entries a batch at a time, committing between
+    # batches. Uses idx_diary_user_date so each batch is an index range scan.
+    # Only ids up to `max_id` (taken when the delete was requested) are removed,
+    # so entries from a re-registration during the job are kept.
+    conn = _connect(db_path)
+    try:
+        total = conn.execute(
+            "SELECT COUNT(*) FROM diary_entries WHERE user_email = ? AND id <= ?", (email, max_id)
+        ).fetchone()[0]
+        if job_id:
+            _update_job(job_id, total=total)
+        deleted = 0
+        while True:
+            cursor = conn.execute("""
+                DELETE FROM diary_entries WHERE id IN (
+                    SELECT id FROM diary_entries WHERE user_email = ? AND id <= ? LIMIT ?
+                )
+            """, (email, max_id, batch_size))
+            conn.commit()
+            if cursor.rowcount <= 0:
+                break
+            deleted += cursor.rowcount
+            if job_id:
+                _update_job(job_id, processed=deleted)
+            # Yield the write lock to request handlers between batches
+            time.sleep(0)
+        print(f"Deleted from diary_entries: {deleted} rows for {email}")
+        return deleted
+    finally:
+        conn.close()
+
+
+def purge_user(db_path, email, max_id, job_id=None):
+    # Runs the batched delete for a pending_deletions row, then clears the row.
+    # The row only goes once every entry up to max_id is gone, so a restart
+    # mid-job leaves it for resume_user_deletions to pick up.
+    deleted = delete_user_entries(db_path, email, max_id, job_id)
+    conn = _connect(db_path)
+    try:
+        conn.execute("DELETE FROM pending_deletions WHERE email = ? AND max_id = ?", (email, max_id))
+        conn.commit()
+    finally:
+        conn.close()
+    return deleted
+
+
+def resume_user_deletions(db_path, on_done=None):
+    # Restarts deletions left unfinished by a previous process
+    conn = _connect(db_path)
+    try:
+        pending = conn.execute("SELECT email, max_id FROM pending_deletions").fetchall()
+    finally:
+        conn.close()
+    for email, max_id in pending:
+        print(f"Resuming diary deletion for {email}")
+
+        def work(jid, email=email, max_id=max_id):
+            purge_user(db_path, email, max_id, jid)
+            if on_done:
+                on_done()
+        start_job("delete_user", work, target=email)
+    return len(pending)
+
+
+def compact_old_entries(db_path, days=RETENTION_DAYS, job_id=None, batch_size=BATCH_SIZE):
+    # Retention: clears raw `content` on entries older than `days`, keeping
+    # sentiment/score/summary for history and analytics. Walks by id so each
+    # batch resumes where the previous one stopped.
+    if days <= 0:
+        return 0
+    cutoff = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    conn = _connect(db_path)
+    try:
+        total = conn.execute(
+            "SELECT COUNT(*) FROM diary_entries WHERE date < ? AND content IS NOT NULL",
+            (cutoff,)
+        ).fetchone()[0]
+        if job_id:
+            _update_job(job_id, total=total)
+        compacted = 0
+        last_id = 0
+        while True:
+            ids = [r[0] for r in conn.execute("""
+                SELECT id FROM diary_entries
+                WHERE id > ? AND date < ? AND content IS NOT NULL
+                ORDER BY id LIMIT ?
+            """, (last_id, cutoff, batch_size)).fetchall()]
+            if not ids:
+                break
+            placeholders = ",".join("?" * len(ids))
+            conn.execute(f"UPDATE diary_entries SET content = NULL WHERE id IN ({placeholders})", ids)
+            conn.commit()
+            compacted += len(ids)
+            last_id = ids[-1]
+            if job_id:
+                _update_job(job_id, processed=compacted)
+            time.sleep(0)
+        print(f"Retention: compacted {compacted} entries older than {days} days")
+        return compacted
+    finally:
+        conn.close()
+
+
+def analyze_db(db_path, job_id=None):
+    conn = _connect(db_path)
+    try:
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def vacuum_db(db_path, job_id=None):
+    # VACUUM rewrites the whole file, so it only runs on the slow schedule
+    conn = _connect(db_path)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def start_job(kind, work, target=None):
+    # Runs `work(job_id)` on a daemon thread and returns the job id immediately
+    job_id = new_job(kind, target)
+    threading.Thread(target=_run_job, args=(job_id, work), daemon=True).start()
+    return job_id
+
+
+async def maintenance_loop(db_path, on_user_deleted=None):
+    # Periodic retention + ANALYZE, with VACUUM on a longer interval.
+    # Blocking SQLite work runs in a worker thread so the event loop stays free.
+    try:
+        await asyncio.to_thread(resume_user_deletions, db_path, on_user_deleted)
+    except Exception as e:
+        print(f"Could not resume pending deletions: {e}")
+    last_vacuum = time.monotonic()
+    while True:
+        await asyncio.sleep(MAINTENANCE_INTERVAL_HOURS * 3600)
+        try:
+            if RETENTION_DAYS > 0:
+                job_id = new_job("retention")
+                await asyncio.to_thread(
+                    _run_job, job_id, lambda jid: compact_old_entries(db_path, RETENTION_DAYS, jid)
+                )
+            job_id = new_job("analyze")
+            await asyncio.to_thread(_run_job, job_id, lambda jid: analyze_db(db_path, jid))
+            if time.monotonic() - last_vacuum >= VACUUM_INTERVAL_HOURS * 3600:
+                job_id = new_job("vacuum")
+                await asyncio.to_thread(_run_job, job_id, lambda jid: vacuum_db(db_path, jid))
+                last_vacuum = time.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Maintenance loop error: {e}")
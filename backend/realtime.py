@@ -0,0 +1,118 @@
+import os
+import time
+import asyncio
+from collections import defaultdict
+
+# --- Real-time Push Hub ---
+# In-process pub/sub: one bounded queue per connected client, keyed by user
+# email. Runs inside a single worker; with several workers each one only
+# reaches the clients connected to it.
+QUEUE_SIZE = int(os.getenv("PUSH_QUEUE_SIZE", "64"))
+# Clients that haven't received anything (events or heartbeats) for this long are dropped
+IDLE_TIMEOUT_SECONDS = float(os.getenv("PUSH_IDLE_TIMEOUT", "120"))
+HEARTBEAT_SECONDS = float(os.getenv("PUSH_HEARTBEAT", "25"))
+
+
+class Subscriber:
+    def __init__(self, email, queue_size=QUEUE_SIZE):
+        self.email = email
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.last_active = time.monotonic()
+        self.dropped = 0
+        self.closed = False
+
+    def offer(self, event):
+        # Backpressure: a slow client loses its oldest events instead of
+        # growing memory or stalling the publisher.
+        if self.closed:
+            return
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(event)
+
+    async def next_event(self, timeout=HEARTBEAT_SECONDS):
+        # Returns the next event, or a heartbeat if nothing arrives in `timeout`
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            event = {"type": "heartbeat"}
+        if event is None:
+            raise ConnectionAbortedError("Subscriber closed")
+        return event
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        # Wake a reader blocked in next_event()
+        while True:
+            try:
+                self.queue.put_nowait(None)
+                break
+            except asyncio.QueueFull:
+                self.queue.get_nowait()
+
+
+class Hub:
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.published = 0
+
+    def subscribe(self, email):
+        sub = Subscriber(email)
+        self.subscribers[email].add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        sub.close()
+        subs = self.subscribers.get(sub.email)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self.subscribers[sub.email]
+
+    def publish(self, email, event):
+        # Non-blocking fan-out to every connection of this user; returns receivers
+        subs = self.subscribers.get(email)
+        if not subs:
+            return 0
+        for sub in subs:
+            sub.offer(event)
+        self.published += 1
+        return len(subs)
+
+    def connection_count(self):
+        return sum(len(subs) for subs in self.subscribers.values())
+
+    def stats(self):
+        return {
+            "users": len(self.subscribers),
+            "connections": self.connection_count(),
+            "published": self.published,
+            "dropped": sum(s.dropped for subs in self.subscribers.values() for s in subs),
+        }
+
+    def reap_idle(self, timeout=IDLE_TIMEOUT_SECONDS):
+        now = time.monotonic()
+        stale = [s for subs in self.subscribers.values() for s in subs
+                 if now - s.last_active > timeout]
+        for sub in stale:
+            self.unsubscribe(sub)
+        return len(stale)
+
+    async def reaper_loop(self, interval=30):
+        while True:
+            await asyncio.sleep(interval)
+            removed = self.reap_idle()
+            if removed:
+                print(f"Push hub: closed {removed} idle connections")
+
+
+hub = Hub()
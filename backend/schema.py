@@ -0,0 +1,44 @@
+import community
+
+# Table definitions shared by the app (main.init_db) and the bulk import CLI
+
+
+def create_tables(cursor):
+    # Users table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            email TEXT PRIMARY KEY,
+            name TEXT,
+            phone TEXT,
+            password TEXT
+        )
+    ''')
+    # Diary entries table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS diary_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT,
+            content TEXT,
+            lang TEXT,
+            sentiment TEXT,
+            score INTEGER,
+            summary TEXT,
+            prescription TEXT,
+            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_email) REFERENCES users (email)
+        )
+    ''')
+    # Per-user lookups (history, chat context, deletion) and retention scans by date
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_diary_user_date ON diary_entries (user_email, date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_diary_date ON diary_entries (date)")
+    # Users whose diary entries are still being deleted in the background;
+    # leftover rows are resumed by maintenance_loop after a restart
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pending_deletions (
+            email TEXT PRIMARY KEY,
+            max_id INTEGER,
+            requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Community posts, likes and comments
+    community.init_tables(cursor)
@@ -1,5 +1,7 @@
 import sqlite3
 
+from auth import hash_password
+
 def setup_test_user():
     DB_PATH = "feelconomy.db"
     conn = sqlite3.connect(DB_PATH)
@@ -17,7 +19,7 @@ def setup_test_user():
     
     # Insert a test user
     cursor.execute("INSERT OR REPLACE INTO users (email, name, phone, password) VALUES (?, ?, ?, ?)", 
-                   ('user@test.com', 'Test User', '010-1234-5678', 'password123'))
+                   ('user@test.com', 'Test User', '010-1234-5678', hash_password('password123')))
     
     conn.commit()
     conn.close()
@@ -1,8 +1,11 @@
+import os
 import streamlit as st
 import requests
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 st.set_page_config(page_title="토닥토닥 - 당신의 마음을 안아주는 AI", layout="wide", initial_sidebar_state="collapsed")
 
@@ -34,7 +37,9 @@ TRANSLATIONS = {
         "stress_load": "현재 스트레스 부하",
         "stress_high": "다소 높음",
         "emergency_alert": "🚨 긴급 알림",
-        "emergency_msg": "최근 15분 내 심박수 급증이 포착되었습니다. 집중력이 흐트러질 수 있으니 **3분간의 복식 호흡**을 권장합니다."
+        "emergency_msg": "최근 15분 내 심박수 급증이 포착되었습니다. 집중력이 흐트러질 수 있으니 **3분간의 복식 호흡**을 권장합니다.",
+        "email_label": "내 이메일 (기록 저장용)",
+        "history_header": "🗂️ 최근 감정 기록"
     },
     "en": {
         "title": "☁️ SereneSoul",
@@ -62,7 +67,9 @@ TRANSLATIONS = {
         "stress_load": "Emotional Pressure",
         "stress_high": "Seeking Balance",
         "emergency_alert": "🚨 Time to Pause",
-        "emergency_msg": "A ripple in your heart rate detected. We suggest **3 minutes of focused breathing** to find your center."
+        "emergency_msg": "A ripple in your heart rate detected. We suggest **3 minutes of focused breathing** to find your center.",
+        "email_label": "Your email (to keep your journey)",
+        "history_header": "🗂️ Recent Reflections"
     },
     "ph": {
         "title": "☁️ Kalingang Puso",
@@ -90,7 +97,9 @@ TRANSLATIONS = {
         "stress_load": "Antas ng Stress",
         "stress_high": "Masyadong Pagod",
         "emergency_alert": "🚨 Mahalagang Babala",
-        "emergency_msg": "May nakitang mabilis na pagtibok ng puso sa nakalipas na 15 minuto. Inirerekomenda namin ang **3 minutong paghinga nang malalim**."
+        "emergency_msg": "May nakitang mabilis na pagtibok ng puso sa nakalipas na 15 minuto. Inirerekomenda namin ang **3 minutong paghinga nang malalim**.",
+        "email_label": "Iyong email (para itabi ang iyong kwento)",
+        "history_header": "🗂️ Mga Huling Tala"
     },
     "zh": {
         "title": "☁️ 舒心小站",
@@ -118,10 +127,67 @@ TRANSLATIONS = {
         "stress_load": "当前压力负载",
         "stress_high": "略高",
         "emergency_alert": "🚨 紧急预警",
-        "emergency_msg": "检测到近15分钟内心率异常升高。建议您进行 **3分钟深呼吸** 以缓解情绪。"
+        "emergency_msg": "检测到近15分钟内心率异常升高。建议您进行 **3分钟深呼吸** 以缓解情绪。",
+        "email_label": "您的邮箱（用于保存记录）",
+        "history_header": "🗂️ 最近的情感记录"
     }
 }
 
+# --- Backend Client ---
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000").rstrip("/")
+# (connect, read) seconds; Gemini analysis can take a while to respond
+REQUEST_TIMEOUT = (3.05, float(os.getenv("BACKEND_TIMEOUT", "60")))
+
+class BackendClient:
+    """Pooled, retrying HTTP client shared by every session of this app."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.session = requests.Session()
+        # Retry transient failures only; POSTs are retried just on connection errors
+        retry = Retry(total=3, connect=3, read=0, backoff_factor=0.3,
+                      status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, path):
+        return self.session.get(f"{self.base_url}{path}", timeout=REQUEST_TIMEOUT)
+
+    def post(self, path, payload):
+        return self.session.post(f"{self.base_url}{path}", json=payload, timeout=REQUEST_TIMEOUT)
+
+@st.cache_resource
+def get_backend():
+    return BackendClient(BACKEND_URL)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_history(email):
+    # Keyed by user only (/history ignores language); cleared after a new analysis is saved
+    response = get_backend().get(f"/history/{email}")
+    response.raise_for_status()
+    return response.json().get("history", [])
+
+@st.cache_data(ttl=120, show_spinner=False)
+def build_heart_rate_chart(lang, hr_title):
+    # Rebuilt at most once per sample interval instead of on every rerun
+    now = datetime.now()
+    chart_data = pd.DataFrame({
+        'Time': pd.date_range(end=now, periods=20, freq='2min'),
+        'Heart Rate (BPM)': [72, 74, 71, 68, 70, 75, 82, 95, 102, 98, 85, 76, 74, 72, 71, 73, 75, 74, 72, 70]
+    })
+    fig = px.area(chart_data, x='Time', y='Heart Rate (BPM)', 
+                  title=hr_title,
+                  color_discrete_sequence=['#e74c3c'])
+    fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+    return chart_data, fig
+
+# Streamlit scripts are synchronous, so requests still block; running each tab as a
+# fragment limits that to the tab in use instead of rerunning the whole page
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda f: f)
+
+backend = get_backend()
+
 # Language Picker at the top
 col_title, col_lang = st.columns([3, 1])
 
@@ -132,6 +198,9 @@ with col_lang:
 
 t = TRANSLATIONS[lang_code]
 
+with st.sidebar:
+    user_email = st.text_input(t['email_label'], key="user_email").strip() or None
+
 # Advanced Premium CSS Injection
 st.markdown("""
     <link rel="preconnect" href="https://fonts.googleapis.com">
@@ -315,9 +384,33 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-tab1, tab2, tab3 = st.tabs([t['tab_prescription'], t['tab_chat'], t['tab_wearable']])
+def render_result(result):
+    st.markdown(f'<div class="glass-card">', unsafe_allow_html=True)
+    st.subheader(t['report_header'])
+    
+    c1, c2 = st.columns(2)
+    with c1:
+        index_color = "#4CAF50" if result['index'] > 60 else "#FF9800" if result['index'] > 30 else "#F44336"
+        st.markdown(f"### <span style='color:{index_color}'>{result['index']}/100</span>", unsafe_allow_html=True)
+        st.write(t['stability_index'])
+    with c2:
+        st.markdown(f"<div class='sentiment-badge' style='background:{index_color}33; color:{index_color}'>#{result['sentiment']}</div>", unsafe_allow_html=True)
+        st.write(t['core_sentiment'])
+    
+    st.markdown("---")
+    st.write(f"**{t['ai_word']}**")
+    st.write(result['summary'])
+    
+    st.markdown(f"""
+    <div class="prescription-box">
+        <b>{t['prescription_label']}</b><br>
+        {result['prescription']}
+    </div>
+    """, unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
 
-with tab1:
+@fragment
+def prescription_tab():
     col_input, col_output = st.columns([1, 1], gap="large")
     
     with col_input:
@@ -332,43 +425,36 @@ with tab1:
             if len(diary_content.strip()) >= 5:
                 with st.spinner(t['analyzing']):
                     try:
-                        response = requests.post("http://localhost:8000/analyze-sentiment", json={"content": diary_content, "lang": lang_code})
+                        response = backend.post("/analyze-sentiment", {"content": diary_content, "lang": lang_code, "user_email": user_email})
                         if response.status_code == 200:
-                            result = response.json()
-                            
-                            st.markdown(f'<div class="glass-card">', unsafe_allow_html=True)
-                            st.subheader(t['report_header'])
-                            
-                            c1, c2 = st.columns(2)
-                            with c1:
-                                index_color = "#4CAF50" if result['index'] > 60 else "#FF9800" if result['index'] > 30 else "#F44336"
-                                st.markdown(f"### <span style='color:{index_color}'>{result['index']}/100</span>", unsafe_allow_html=True)
-                                st.write(t['stability_index'])
-                            with c2:
-                                st.markdown(f"<div class='sentiment-badge' style='background:{index_color}33; color:{index_color}'>#{result['sentiment']}</div>", unsafe_allow_html=True)
-                                st.write(t['core_sentiment'])
-                            
-                            st.markdown("---")
-                            st.write(f"**{t['ai_word']}**")
-                            st.write(result['summary'])
-                            
-                            st.markdown(f"""
-                            <div class="prescription-box">
-                                <b>{t['prescription_label']}</b><br>
-                                {result['prescription']}
-                            </div>
-                            """, unsafe_allow_html=True)
-                            st.markdown('</div>', unsafe_allow_html=True)
+                            st.session_state.last_result = response.json()
+                            if user_email:
+                                fetch_history.clear(user_email)
                         else:
                             st.error(f"Error: {response.text}")
                     except Exception as e:
                         st.error(f"Error: {e}")
             else:
                 st.warning("Please tell me more (at least 5 chars).")
-        else:
+
+        if st.session_state.get("last_result"):
+            render_result(st.session_state.last_result)
+        elif not analyze_btn:
             st.markdown(f'<div class="glass-card" style="display: flex; flex-direction: column; align-items: center; justify-content: center; height: 100%; min-height: 400px; text-align: center;">{t["no_analysis"]}</div>', unsafe_allow_html=True)
 
-with tab2:
+        if user_email:
+            try:
+                history = fetch_history(user_email)
+            except Exception as e:
+                history = []
+                st.error(f"Error: {e}")
+            if history:
+                st.subheader(t['history_header'])
+                st.dataframe(pd.DataFrame(history)[['date', 'score', 'sentiment', 'summary']].head(10),
+                             hide_index=True, use_container_width=True)
+
+@fragment
+def chat_tab():
     st.markdown('<div class="glass-card">', unsafe_allow_html=True)
     st.header(t['chat_header'])
     st.write(t['chat_desc'])
@@ -395,8 +481,8 @@ with tab2:
                 for msg in st.session_state.messages[:-1]: # Exclude the current user message just added
                     history.append({"role": msg["role"], "content": msg["content"]})
                 
-                response = requests.post("http://localhost:8000/chat", 
-                                         json={"message": prompt, "history": history, "lang": lang_code})
+                response = backend.post("/chat",
+                                        {"message": prompt, "history": history, "lang": lang_code, "user_email": user_email})
                 if response.status_code == 200:
                     ai_response = response.json()["response"]
                     st.markdown(ai_response)
@@ -406,6 +492,14 @@ with tab2:
             except Exception as e:
                 st.error(f"Error: {e}")
 
+tab1, tab2, tab3 = st.tabs([t['tab_prescription'], t['tab_chat'], t['tab_wearable']])
+
+with tab1:
+    prescription_tab()
+
+with tab2:
+    chat_tab()
+
 with tab3:
     st.markdown('<div class="glass-card">', unsafe_allow_html=True)
     st.header(t['wearable_header'])
@@ -415,15 +509,7 @@ with tab3:
     col1, col2 = st.columns([2, 1])
     with col1:
         st.markdown('<div class="glass-card">', unsafe_allow_html=True)
-        now = datetime.now()
-        chart_data = pd.DataFrame({
-            'Time': pd.date_range(end=now, periods=20, freq='2min'),
-            'Heart Rate (BPM)': [72, 74, 71, 68, 70, 75, 82, 95, 102, 98, 85, 76, 74, 72, 71, 73, 75, 74, 72, 70]
-        })
-        fig = px.area(chart_data, x='Time', y='Heart Rate (BPM)', 
-                      title=t['hr_title'],
-                      color_discrete_sequence=['#e74c3c'])
-        fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+        chart_data, fig = build_heart_rate_chart(lang_code, t['hr_title'])
         st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
         